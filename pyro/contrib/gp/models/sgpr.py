@@ -6,6 +6,7 @@ from torch.nn import Parameter
 
 import pyro
 import pyro.distributions as dist
+from pyro.contrib.gp.util import add_jitter
 from pyro.distributions.util import matrix_triangular_solve_compat
 
 from .model import GPModel
@@ -125,8 +126,7 @@ class SparseGPRegression(GPModel):
         # y_cov = W.T @ W + D
         # trace_term is added into log_prob
 
-        M = Xu.shape[0]
-        Kuu = self.kernel(Xu) + torch.eye(M, out=Xu.new_empty(M, M)) * self.jitter
+        Kuu = add_jitter(self.kernel(Xu), self.jitter)
         Luu = Kuu.potrf(upper=False)
         Kuf = self.kernel(Xu, self.X)
         W = matrix_triangular_solve_compat(Kuf, Luu, upper=False)
@@ -201,7 +201,7 @@ class SparseGPRegression(GPModel):
         N = self.X.shape[0]
         M = Xu.shape[0]
 
-        Kuu = kernel(Xu) + torch.eye(M, out=Xu.new_empty(M, M)) * self.jitter
+        Kuu = add_jitter(kernel(Xu), self.jitter)
         Luu = Kuu.potrf(upper=False)
         Kus = kernel(Xu, Xnew)
         Kuf = kernel(Xu, self.X)
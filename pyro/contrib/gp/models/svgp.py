@@ -6,10 +6,15 @@ from torch.nn import Parameter
 
 import pyro
 import pyro.distributions as dist
-from pyro.contrib.gp.util import conditional
+from pyro.contrib.gp.util import Parameterized, _whitened_conditional, add_jitter, conditional
+from pyro.distributions.util import matrix_cholesky_compat, matrix_triangular_solve_compat
 
 from .model import GPModel
 
+# compiled version of SparseVariationalGP._predictive, shared by all instances and
+# kept out of their state so that models can still be pickled
+_compiled_predictive = None
+
 
 class SparseVariationalGP(GPModel):
     r"""
@@ -66,50 +71,85 @@ class SparseVariationalGP(GPModel):
         corresponse to the number of classes.
     :param float jitter: A small positive term which is added into the diagonal part of
         a covariance matrix to help stablize its Cholesky decomposition.
+    :param bool mixed_precision: A flag to decide if we want to compute the Cholesky
+        decomposition of :math:`k(X_u, X_u)` in single precision when the model is in
+        double precision, which is much faster on GPUs with low double precision
+        throughput. The factor is cast back to double precision for the remaining
+        computations, and ``jitter`` is raised to at least ``1e-5`` for the single
+        precision decomposition. It has no effect on models of other precisions.
+    :param bool compile: A flag to decide if we want to compile the numeric part of
+        :meth:`model` with :func:`torch.compile`. This requires a PyTorch version
+        which provides it.
+    :param bool lazy: A flag to decide if we want to delay the creation of variational
+        parameters ``u_loc`` and ``u_scale_tril`` until the first call of
+        :meth:`model`, :meth:`guide`, :meth:`forward`, :meth:`fix_param` or
+        :meth:`~torch.nn.Module.load_state_dict`. Each of these calls creates them
+        with their default values (also when the param store already holds other
+        values), so this only saves :math:`\mathcal{O}(M^2)` memory per latent
+        process for models which never use them. Until then, they are not returned
+        by :meth:`~torch.nn.Module.parameters`, so a PyTorch optimizer should not be
+        built from it before that first call (Pyro optimizers work on the param
+        store and are not affected).
     :param str name: Name of this model.
     """
     def __init__(self, X, y, kernel, Xu, likelihood, latent_shape=None,
-                 jitter=1e-6, name="SVGP"):
+                 jitter=1e-6, mixed_precision=False, compile=False, lazy=False,
+                 name="SVGP"):
         super(SparseVariationalGP, self).__init__(X, y, kernel, jitter, name)
         self.likelihood = likelihood
+        self.mixed_precision = mixed_precision
+        if compile and not hasattr(torch, "compile"):
+            raise ValueError("compile=True requires torch.compile, which is not "
+                             "available in PyTorch {}.".format(torch.__version__))
+        # not stored as `compile`, which is a method of torch.nn.Module in recent versions
+        self._compile = compile
 
         self.Xu = Parameter(Xu)
 
         y_batch_shape = self.y.shape[:-1] if self.y is not None else torch.Size([])
         self.latent_shape = latent_shape if latent_shape is not None else y_batch_shape
 
-        M = self.Xu.shape[0]
-        u_loc_shape = self.latent_shape + (M,)
-        u_loc = self.Xu.new_zeros(u_loc_shape)
-        self.u_loc = Parameter(u_loc)
-
-        u_scale_tril_shape = self.latent_shape + (M, M)
-        u_scale_tril = torch.eye(M, out=self.Xu.new_empty(M, M))
-        u_scale_tril = u_scale_tril.expand(u_scale_tril_shape)
-        self.u_scale_tril = Parameter(u_scale_tril)
+        self.u_loc = None
+        self.u_scale_tril = None
+        if not lazy:
+            self._init_variational_params()
         self.set_constraint("u_scale_tril", constraints.lower_cholesky)
 
         self._sample_latent = True
+        self._Luu_cache = None
+        self._Luu_key = None
+        self._pred_cache = None
+
+    def fix_param(self, param, value=None):
+        if value is None and param in ["u_loc", "u_scale_tril"]:
+            self._init_variational_params()
+        super(SparseVariationalGP, self).fix_param(param, value)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # lazy variational parameters must exist to receive their saved values
+        if prefix + "u_loc" in state_dict or prefix + "u_scale_tril" in state_dict:
+            self._init_variational_params()
+        super(SparseVariationalGP, self)._load_from_state_dict(state_dict, prefix,
+                                                               *args, **kwargs)
 
     def model(self):
+        self._init_variational_params()
         self.set_mode("model")
 
         Xu = self.get_param("Xu")
         u_loc = self.get_param("u_loc")
         u_scale_tril = self.get_param("u_scale_tril")
 
-        M = Xu.shape[0]
-        Kuu = self.kernel(Xu) + torch.eye(M, out=Xu.new_empty(M, M)) * self.jitter
-        Luu = Kuu.potrf(upper=False)
+        Luu = self._get_Luu(Xu)
 
         zero_loc = Xu.new_zeros(u_loc.shape)
         u_name = pyro.param_with_module_name(self.name, "u")
         pyro.sample(u_name,
-                    dist.MultivariateNormal(zero_loc, scale_tril=Luu)
-                        .reshape(extra_event_dims=zero_loc.dim()-1))
+                    dist.Independent(dist.SharedScaleTrilMultivariateNormal(zero_loc, scale_tril=Luu),
+                                     reinterpreted_batch_ndims=zero_loc.dim()-1))
 
-        f_loc, f_var = conditional(self.X, Xu, self.kernel, u_loc, u_scale_tril,
-                                   Luu, full_cov=False, jitter=self.jitter)
+        f_loc, f_var = self._get_predictive_fn()(self.X, Xu, self.kernel, u_loc,
+                                                 u_scale_tril, Luu, False, self.jitter)
 
         if self.y is None:
             return f_loc, f_var
@@ -117,6 +157,7 @@ class SparseVariationalGP(GPModel):
             return self.likelihood(f_loc, f_var, self.y)
 
     def guide(self):
+        self._init_variational_params()
         self.set_mode("guide")
 
         Xu = self.get_param("Xu")
@@ -126,8 +167,8 @@ class SparseVariationalGP(GPModel):
         if self._sample_latent:
             u_name = pyro.param_with_module_name(self.name, "u")
             pyro.sample(u_name,
-                        dist.MultivariateNormal(u_loc, scale_tril=u_scale_tril)
-                            .reshape(extra_event_dims=u_loc.dim()-1))
+                        dist.Independent(dist.MultivariateNormal(u_loc, scale_tril=u_scale_tril),
+                                         reinterpreted_batch_ndims=u_loc.dim()-1))
         return Xu, self.kernel, u_loc, u_scale_tril
 
     def forward(self, Xnew, full_cov=False):
@@ -150,11 +191,166 @@ class SparseVariationalGP(GPModel):
         :rtype: tuple(torch.Tensor, torch.Tensor)
         """
         self._check_Xnew_shape(Xnew)
-        tmp_sample_latent = self._sample_latent
-        self._sample_latent = False
-        Xu, kernel, u_loc, u_scale_tril = self.guide()
-        self._sample_latent = tmp_sample_latent
-
-        loc, cov = conditional(Xnew, Xu, kernel, u_loc, u_scale_tril,
-                               full_cov=full_cov, jitter=self.jitter)
-        return loc, cov
+        self._init_variational_params()
+        self.set_mode("guide")
+
+        Xu = self.get_param("Xu")
+        u_loc = self.get_param("u_loc")
+        u_scale_tril = self.get_param("u_scale_tril")
+
+        Luu = self._get_Luu(Xu)
+        return self._predict_cached(Xnew, Xu, u_loc, u_scale_tril, Luu, full_cov)
+
+    def _predict_cached(self, Xnew, Xu, u_loc, u_scale_tril, Luu, full_cov=False):
+        """
+        Same computation as :func:`~pyro.contrib.gp.util.conditional`, but the
+        whitened variational parameters ``inv(Luu) @ u_loc`` and
+        ``inv(Luu) @ u_scale_tril``, which do not depend on ``Xnew``, are reused from
+        a previous call when possible (see :meth:`_get_whitened_u`).
+        """
+        v_2D, S_2D = self._get_whitened_u(Luu, u_loc, u_scale_tril)
+        Kus = self.kernel(Xu, Xnew)
+        W = matrix_triangular_solve_compat(Kus, Luu, upper=False)
+        return _whitened_conditional(Xnew, self.kernel, v_2D, W, S_2D, u_loc.shape[:-1],
+                                     full_cov)
+
+    def _get_whitened_u(self, Luu, u_loc, u_scale_tril):
+        r"""
+        Returns ``inv(Luu) @ u_loc`` and ``inv(Luu) @ u_scale_tril`` packed as 2D
+        tensors, in the same layout used by
+        :func:`~pyro.contrib.gp.util.conditional`.
+
+        As for :meth:`_get_Luu`, the result is cached only when gradients are not
+        needed. To avoid holding copies of size :math:`\mathcal{O}(LM^2)`, the
+        cache key refers to the tensors stored in the param store (which are
+        updated in place by optimizers) together with cheap checksums of the
+        current values of ``u_loc`` and ``u_scale_tril``.
+        """
+        params = [u_loc, u_scale_tril]
+        use_cache = not (torch.is_grad_enabled() and
+                         any(p.requires_grad for p in [Luu] + params))
+        key = None
+        if use_cache:
+            key = []
+            for p in params:
+                source = p.unconstrained() if hasattr(p, "unconstrained") else p
+                key.append((source, p.sum().item(), p.pow(2).sum().item()))
+            if (self._pred_cache is not None and self._pred_cache[0] is Luu and
+                    all(k[0] is q[0] and k[1:] == q[1:]
+                        for k, q in zip(key, self._pred_cache[1]))):
+                return self._pred_cache[2]
+
+        M = Luu.shape[0]
+        latent_shape = u_loc.shape[:-1]
+        # convert u_loc_shape from latent_shape x M to M x latent_shape
+        u_loc_2D = u_loc.permute(-1, *range(len(latent_shape))).reshape(M, -1)
+        # convert u_scale_tril_shape from latent_shape x M x M to M x M x latent_shape
+        u_scale_tril_2D = (u_scale_tril.permute(-2, -1, *range(len(latent_shape)))
+                           .reshape(M, -1))
+        pack = torch.cat((u_loc_2D, u_scale_tril_2D), dim=1)
+        Luuinv_pack = matrix_triangular_solve_compat(pack, Luu, upper=False)
+        # unpack
+        v_2D = Luuinv_pack[:, :u_loc_2D.shape[1]]
+        S_2D = Luuinv_pack[:, u_loc_2D.shape[1]:]
+
+        if use_cache and not Luuinv_pack.requires_grad:
+            self._pred_cache = (Luu, key, (v_2D, S_2D))
+        else:
+            self._pred_cache = None
+        return v_2D, S_2D
+
+    def _init_variational_params(self):
+        """
+        Creates variational parameters ``u_loc`` and ``u_scale_tril`` if they have
+        not been created yet.
+        """
+        if self.u_loc is not None:
+            return
+
+        M = self.Xu.shape[0]
+        u_loc_shape = self.latent_shape + (M,)
+        u_loc = self.Xu.new_zeros(u_loc_shape)
+        self.u_loc = Parameter(u_loc)
+
+        if hasattr(torch, "diag_embed"):
+            u_scale_tril = torch.diag_embed(self.Xu.new_ones(u_loc_shape))
+        else:
+            u_scale_tril_shape = self.latent_shape + (M, M)
+            u_scale_tril = torch.eye(M, out=self.Xu.new_empty(M, M))
+            u_scale_tril = u_scale_tril.expand(u_scale_tril_shape).contiguous()
+        self.u_scale_tril = Parameter(u_scale_tril)
+
+    @staticmethod
+    def _predictive(Xnew, Xu, kernel, u_loc, u_scale_tril, Luu, full_cov, jitter):
+        """
+        Numeric core of :meth:`model`. It is free of Pyro primitives, so it can be
+        compiled as a whole. :meth:`forward` uses :meth:`_predict_cached` instead.
+        """
+        return conditional(Xnew, Xu, kernel, u_loc, u_scale_tril, Lff=Luu,
+                           full_cov=full_cov, jitter=jitter)
+
+    def _get_predictive_fn(self):
+        """
+        Returns :meth:`_predictive`, compiled by :func:`torch.compile` on first use
+        if ``compile=True``.
+        """
+        if not self._compile:
+            return self._predictive
+        global _compiled_predictive
+        if _compiled_predictive is None:
+            _compiled_predictive = torch.compile(SparseVariationalGP._predictive)
+        return _compiled_predictive
+
+    def _get_Luu(self, Xu):
+        """
+        Returns the Cholesky decomposition of :math:`k(X_u, X_u)`, reusing the one
+        from a previous call when ``Xu`` and kernel's parameters have not changed.
+
+        The cache is only used when gradients are not needed (e.g. under
+        :func:`torch.no_grad` or when all parameters are fixed), so an autograd graph
+        is never backpropagated through twice.
+
+        .. note:: The cache key covers ``Xu``, the current values of kernel's
+            parameters and the parameters of :class:`torch.nn.Module` submodules of
+            the kernel which are not :class:`~pyro.contrib.gp.util.Parameterized`
+            (e.g. the ``iwarping_fn`` of :class:`~pyro.contrib.gp.kernels.Warping`).
+            State of other plain callables used by the kernel is not tracked.
+
+        :param torch.Tensor Xu: Inducing inputs.
+        """
+        # only collect the values which are actually used to compute Kuu: raw
+        # parameters of Parameterized modules are replaced by their registered values
+        params = [Xu]
+        for module in self.kernel.modules():
+            if isinstance(module, Parameterized):
+                params.extend(module._registered_params.values())
+            else:
+                params.extend(p for p in module._parameters.values() if p is not None)
+        use_cache = not (torch.is_grad_enabled() and any(p.requires_grad for p in params))
+        # optimizers update parameters through `.data`, which does not bump their
+        # version counters, so we compare values instead
+        options = (self.jitter, self.mixed_precision)
+        if (use_cache and self._Luu_key is not None and self._Luu_key[0] == options and
+                len(self._Luu_key[1]) == len(params) and
+                all(p.shape == q.shape and p.dtype == q.dtype and p.device == q.device and
+                    torch.equal(p, q) for p, q in zip(params, self._Luu_key[1]))):
+            return self._Luu_cache
+
+        # add_jitter returns a contiguous Kuu, for which the upper Cholesky factor
+        # is computed without a transpose copy; Luu is then a free transposed view
+        Kuu = self.kernel(Xu)
+        if self.mixed_precision and Kuu.dtype == torch.float64:
+            # single precision needs a larger jitter to stay positive definite
+            Kuu = add_jitter(Kuu, max(1e-5, self.jitter))
+            Uuu = matrix_cholesky_compat(Kuu.float(), upper=True).type_as(Kuu)
+        else:
+            Kuu = add_jitter(Kuu, self.jitter)
+            Uuu = matrix_cholesky_compat(Kuu, upper=True)
+        Luu = Uuu.t()
+        if use_cache and not Luu.requires_grad:
+            self._Luu_cache = Luu
+            self._Luu_key = (options, [p.detach().clone() for p in params])
+        else:
+            self._Luu_cache = None
+            self._Luu_key = None
+        return Luu
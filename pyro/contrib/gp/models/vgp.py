@@ -1,12 +1,14 @@
 from __future__ import absolute_import, division, print_function
 
+from contextlib import contextmanager
+
 import torch
 from torch.distributions import constraints
 from torch.nn import Parameter
 
 import pyro
 import pyro.distributions as dist
-from pyro.contrib.gp.util import conditional
+from pyro.contrib.gp.util import add_jitter, conditional
 
 from .model import GPModel
 
@@ -65,9 +67,12 @@ class VariationalGP(GPModel):
         f_loc = self.X.new_zeros(f_loc_shape)
         self.f_loc = Parameter(f_loc)
 
-        f_scale_tril_shape = self.latent_shape + (N, N)
-        f_scale_tril = torch.eye(N, out=self.X.new_empty(N, N))
-        f_scale_tril = f_scale_tril.expand(f_scale_tril_shape)
+        if hasattr(torch, "diag_embed"):
+            f_scale_tril = torch.diag_embed(self.X.new_ones(f_loc_shape))
+        else:
+            f_scale_tril_shape = self.latent_shape + (N, N)
+            f_scale_tril = torch.eye(N, out=self.X.new_empty(N, N))
+            f_scale_tril = f_scale_tril.expand(f_scale_tril_shape).contiguous()
         self.f_scale_tril = Parameter(f_scale_tril)
         self.set_constraint("f_scale_tril", constraints.lower_cholesky)
 
@@ -79,9 +84,7 @@ class VariationalGP(GPModel):
         f_loc = self.get_param("f_loc")
         f_scale_tril = self.get_param("f_scale_tril")
 
-        N = self.X.shape[0]
-        Kff = self.kernel(self.X) + (torch.eye(N, out=self.X.new_empty(N, N)) *
-                                     self.jitter)
+        Kff = add_jitter(self.kernel(self.X), self.jitter)
         Lff = Kff.potrf(upper=False)
 
         zero_loc = self.X.new_zeros(f_loc.shape)
@@ -130,11 +133,23 @@ class VariationalGP(GPModel):
         :rtype: tuple(torch.Tensor, torch.Tensor)
         """
         self._check_Xnew_shape(Xnew)
-        tmp_sample_latent = self._sample_latent
-        self._sample_latent = False
-        kernel, f_loc, f_scale_tril = self.guide()
-        self._sample_latent = tmp_sample_latent
+        with self._no_latent_sample():
+            kernel, f_loc, f_scale_tril = self.guide()
 
         loc, cov = conditional(Xnew, self.X, kernel, f_loc, f_scale_tril,
                                full_cov=full_cov, jitter=self.jitter)
         return loc, cov
+
+    @contextmanager
+    def _no_latent_sample(self):
+        """
+        Context manager in which :meth:`guide` only returns the variational
+        parameters without sampling the latent ``f``. The previous state is restored
+        on exit, even if an exception is raised.
+        """
+        old_sample_latent = self._sample_latent
+        self._sample_latent = False
+        try:
+            yield
+        finally:
+            self._sample_latent = old_sample_latent
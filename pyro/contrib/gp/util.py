@@ -133,6 +133,33 @@ class Parameterized(nn.Module):
         self._registered_params[param] = p
 
 
+def add_jitter(K, jitter):
+    """
+    Adds ``jitter`` to the diagonal part of a covariance matrix ``K`` in-place,
+    without materializing a ``jitter * I`` matrix.
+
+    ``K`` is copied first if it may not own its memory, i.e. it is a view or a
+    broadcasted tensor (e.g. the output of :class:`~pyro.contrib.gp.kernels.Constant`
+    kernel, which shares storage with its ``variance`` parameter), or if it requires
+    grad (autograd may have saved it for the backward pass, e.g. the output of
+    :class:`~pyro.contrib.gp.kernels.Exponent` kernel).
+
+    :param torch.Tensor K: A covariance matrix, usually an output of a kernel, or a
+        batch of covariance matrices with shape batch_shape x N x N.
+    :param float jitter: A small positive term which is added into the diagonal part.
+    :returns: the covariance matrix with jitter added
+    :rtype: torch.Tensor
+    """
+    if not K.is_contiguous():
+        K = K.contiguous()
+    elif K.requires_grad or K._base is not None or 0 in K.stride():
+        # a contiguous tensor can still share storage with others, e.g. when a
+        # scalar is expanded to a 1 x 1 matrix
+        K = K.clone()
+    K.diagonal(dim1=-2, dim2=-1).add_(jitter)
+    return K
+
+
 def conditional(Xnew, X, kernel, f_loc, f_scale_tril=None, Lff=None, full_cov=False,
                 jitter=1e-6):
     """
@@ -176,7 +203,7 @@ def conditional(Xnew, X, kernel, f_loc, f_scale_tril=None, Lff=None, full_cov=Fa
     :param torch.Tensor f_scale_tril: Lower triangular decomposition of covariance
         matrix of :math:`q(f)`'s .
     :param torch.Tensor Lff: Lower triangular decomposition of :math:`kernel(X, X)`
-        (optional).
+        (optional). If it is provided, :math:`kernel(X, X)` is not evaluated.
     :param bool full_cov: A flag to decide if we want to return full covariance
         matrix or just variance.
     :param float jitter: A small positive term which is added into the diagonal part of
@@ -205,7 +232,7 @@ def conditional(Xnew, X, kernel, f_loc, f_scale_tril=None, Lff=None, full_cov=Fa
     latent_shape = f_loc.shape[:-1]
 
     if Lff is None:
-        Kff = kernel(X) + torch.eye(N, out=X.new_empty(N, N)) * jitter
+        Kff = add_jitter(kernel(X), jitter)
         Lff = Kff.potrf(upper=False)
     Kfs = kernel(X, Xnew)
 
@@ -225,6 +252,20 @@ def conditional(Xnew, X, kernel, f_loc, f_scale_tril=None, Lff=None, full_cov=Fa
     # unpack
     v_2D = Lffinv_pack[:, :f_loc_2D.shape[1]]
     W = Lffinv_pack[:, f_loc_2D.shape[1]:f_loc_2D.shape[1] + M]
+    S_2D = Lffinv_pack[:, f_loc_2D.shape[1] + M:] if f_scale_tril is not None else None
+
+    return _whitened_conditional(Xnew, kernel, v_2D, W, S_2D, latent_shape, full_cov)
+
+
+def _whitened_conditional(Xnew, kernel, v_2D, W, S_2D, latent_shape, full_cov=False):
+    """
+    Computes the second half of :func:`conditional` from whitened quantities, where
+    ``v_2D = inv(Lff) @ f_loc`` and ``S_2D = inv(Lff) @ f_scale_tril`` are packed
+    2D tensors of shape N x latent_size and N x (N * latent_size), and
+    ``W = inv(Lff) @ Kf*``. ``S_2D`` is ``None`` in case ``f_scale_tril=None``.
+    """
+    N = W.shape[0]
+    M = Xnew.shape[0]
     Wt = W.t()
 
     loc_shape = latent_shape + (M,)
@@ -239,10 +280,8 @@ def conditional(Xnew, X, kernel, f_loc, f_scale_tril=None, Lff=None, full_cov=Fa
         Qssdiag = W.pow(2).sum(dim=0)
         var = Kssdiag - Qssdiag
 
-    if f_scale_tril is not None:
-        # unpack
-        S_2D = Lffinv_pack[:, -f_scale_tril_2D.shape[1]:]
-        Wt_S_shape = (Xnew.shape[0],) + f_scale_tril.shape[1:]
+    if S_2D is not None:
+        Wt_S_shape = (M, N) + latent_shape
         Wt_S = Wt.matmul(S_2D).reshape(Wt_S_shape)
         # convert Wt_S_shape from M x N x latent_shape to latent_shape x M x N
         Wt_S = Wt_S.permute(list(range(2, Wt_S.dim())) + [0, 1])
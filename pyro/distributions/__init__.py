@@ -7,6 +7,7 @@ from pyro.distributions.half_cauchy import HalfCauchy
 from pyro.distributions.iaf import InverseAutoregressiveFlow
 from pyro.distributions.omt_mvn import OMTMultivariateNormal
 from pyro.distributions.rejector import Rejector
+from pyro.distributions.shared_mvn import SharedScaleTrilMultivariateNormal
 from pyro.distributions.sparse_mvn import SparseMultivariateNormal
 from pyro.distributions.torch import *  # noqa F403
 from pyro.distributions.torch import __all__ as torch_dists
@@ -23,6 +24,7 @@ __all__ = [
     "InverseAutoregressiveFlow",
     "OMTMultivariateNormal",
     "Rejector",
+    "SharedScaleTrilMultivariateNormal",
     "SparseMultivariateNormal",
     "TorchDistribution",
 ]
@@ -0,0 +1,42 @@
+from __future__ import absolute_import, division, print_function
+
+import math
+
+from pyro.distributions.torch import MultivariateNormal
+from pyro.distributions.util import matrix_triangular_solve_compat
+
+
+class SharedScaleTrilMultivariateNormal(MultivariateNormal):
+    """
+    Multivariate Normal distribution whose batch members share a single Cholesky
+    factor of the covariance matrix.
+
+    Its :meth:`log_prob` whitens the whole batch with one triangular solve and
+    computes the log determinant once, instead of broadcasting ``scale_tril`` to
+    the batch shape.
+
+    :param torch.Tensor loc: Mean, of shape ``batch_shape x M``.
+    :param torch.Tensor scale_tril: A 2D lower triangular matrix of size ``M x M``,
+        which is the Cholesky factor of the covariance matrix shared by all batch
+        members.
+    """
+    def __init__(self, loc, scale_tril, validate_args=None):
+        if scale_tril.dim() != 2:
+            raise ValueError("Expected scale_tril to be a 2D tensor, but got dim = {}."
+                             .format(scale_tril.dim()))
+        self._shared_scale_tril = scale_tril
+        super(SharedScaleTrilMultivariateNormal, self).__init__(
+            loc, scale_tril=scale_tril, validate_args=validate_args)
+
+    def log_prob(self, value):
+        if self._validate_args:
+            self._validate_sample(value)
+        diff = value - self.loc
+        M = diff.shape[-1]
+        # convert diff_shape from batch_shape x M to M x batch_shape for packing
+        diff_2D = diff.reshape(-1, M).t()
+        Linv_diff = matrix_triangular_solve_compat(diff_2D, self._shared_scale_tril,
+                                                   upper=False)
+        mahalanobis_squared = Linv_diff.pow(2).sum(dim=0).reshape(diff.shape[:-1])
+        half_log_det = self._shared_scale_tril.diag().log().sum()
+        return -0.5 * (M * math.log(2 * math.pi) + mahalanobis_squared) - half_log_det
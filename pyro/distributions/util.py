@@ -8,6 +8,12 @@ import torch.distributions as torch_dist
 
 _VALIDATION_ENABLED = False
 
+# torch.linalg.cholesky dispatches to batched LAPACK/cuSOLVER kernels; older
+# versions of PyTorch only provide the legacy potrf binding.
+_linalg_cholesky = getattr(getattr(torch, "linalg", None), "cholesky", None)
+# Likewise, triangular solves support autograd and CUDA only in newer versions.
+_linalg_solve_triangular = getattr(getattr(torch, "linalg", None), "solve_triangular", None)
+
 
 def copy_docs_from(source_class, full_text=False):
     """
@@ -189,16 +195,53 @@ def matrix_triangular_solve_compat(b, A, upper=True):
     Computes the solution to the linear equation AX = b,
     where A is a triangular matrix.
 
+    Uses a triangular solve whenever the installed PyTorch supports it for ``A``;
+    otherwise (old versions with ``A`` requiring grad or on GPU) falls back to
+    ``inverse(A) @ b``.
+
     :param b: A 1D or 2D tensor of size N or N x C.
     :param A: A 2D tensor of size N X N.
     :param upper: A flag if A is a upper triangular matrix or not.
     """
-    if A.requires_grad or A.is_cuda:
+    if _linalg_solve_triangular is not None:
+        b_2D = b.unsqueeze(-1) if b.dim() == 1 else b
+        return _linalg_solve_triangular(A, b_2D, upper=upper).reshape(b.shape)
+    elif hasattr(torch, "triangular_solve"):
+        return b.reshape(b.shape[0], -1).triangular_solve(A, upper=upper)[0].reshape(b.shape)
+    elif A.requires_grad or A.is_cuda:
         return A.inverse().matmul(b)
     else:
         return b.trtrs(A, upper=upper)[0].view(b.shape)
 
 
+def matrix_cholesky_compat(A, upper=False):
+    """
+    Computes the Cholesky decomposition of a symmetric positive definite matrix A.
+
+    Uses :func:`torch.linalg.cholesky` when it is available, which avoids the slow
+    single-matrix path of the legacy :meth:`torch.Tensor.potrf` binding on CUDA.
+
+    For a contiguous ``A``, ``upper=True`` avoids an internal transpose copy.
+
+    :param A: A tensor of size N x N, or a batch of such matrices with shape
+        batch_shape x N x N. A batch is factorized in one call when
+        :func:`torch.linalg.cholesky` is available.
+    :param upper: A flag if we want to get a upper triangular matrix or not.
+    """
+    if _linalg_cholesky is not None:
+        if upper:
+            # A is symmetric, so its transpose is a column-major view of the same
+            # matrix which LAPACK can factorize without copying; the transpose of
+            # that lower factor is a row-major upper factor of A
+            return _linalg_cholesky(A.transpose(-2, -1)).transpose(-2, -1)
+        return _linalg_cholesky(A)
+    elif A.dim() == 2:
+        return A.potrf(upper=upper)
+    else:
+        flat_A = A.reshape((-1,) + A.shape[-2:])
+        return torch.stack([Ai.potrf(upper=upper) for Ai in flat_A]).reshape(A.shape)
+
+
 def log_sum_exp(tensor, dim=-1, scale=1.0):
     """
     Numerically stable implementation for the `LogSumExp` operation. The
@@ -6,8 +6,8 @@ import pytest
 import torch
 
 import pyro
-from pyro.contrib.gp.kernels import WhiteNoise, Matern52
-from pyro.contrib.gp.util import conditional
+from pyro.contrib.gp.kernels import Constant, Exponent, Matern52, RBF, WhiteNoise
+from pyro.contrib.gp.util import add_jitter, conditional
 from tests.common import assert_equal
 
 T = namedtuple("TestConditional", ["Xnew", "X", "kernel", "f_loc", "f_scale_tril",
@@ -64,3 +64,51 @@ def test_conditional(Xnew, X, kernel, f_loc, f_scale_tril, loc, cov):
     assert_equal(var0, var1)
     if cov is not None:
         assert_equal(cov0, cov)
+
+
+class _RecordingRBF(RBF):
+    def __init__(self, input_dim):
+        super(_RecordingRBF, self).__init__(input_dim)
+        self.calls = []
+
+    def forward(self, X, Z=None, diag=False):
+        self.calls.append((X, Z, diag))
+        return super(_RecordingRBF, self).forward(X, Z, diag)
+
+
+def test_conditional_with_Lff_skips_Kff():
+    kernel = _RecordingRBF(input_dim=2)
+    Lff = (kernel(X).detach() + torch.eye(3) * 1e-6).potrf(upper=False)
+    kernel.calls = []
+    loc0, var0 = conditional(Xnew, X, kernel, f_loc, f_scale_tril, Lff=Lff)
+    assert kernel.calls
+    assert all(call[0] is not X or call[1] is not None for call in kernel.calls)
+
+    loc1, var1 = conditional(Xnew, X, kernel, f_loc, f_scale_tril)
+    assert_equal(loc0, loc1)
+    assert_equal(var0, var1)
+
+
+@pytest.mark.parametrize("requires_grad", [True, False])
+@pytest.mark.parametrize("kernel, inputs", [
+    (Matern52(input_dim=2), X),
+    (Constant(input_dim=2), X),
+    (Constant(input_dim=2), X[:1]),
+    (Exponent(Matern52(input_dim=2)), X),
+], ids=["Matern52", "Constant", "Constant_M=1", "Exponent"])
+def test_add_jitter(kernel, inputs, requires_grad):
+    N = inputs.shape[0]
+    with torch.set_grad_enabled(requires_grad):
+        K = kernel(inputs)
+        K0 = K.detach().clone()
+        K_jitter = add_jitter(K, 1e-3)
+    assert_equal(K_jitter, K0 + torch.eye(N) * 1e-3)
+    # autograd and kernel's parameters are not affected by the in-place update
+    if requires_grad:
+        K_jitter.sum().backward()
+    assert_equal(kernel(inputs).detach(), K0)
+
+
+def test_add_jitter_batched():
+    K = torch.ones(2, 3, 3)
+    assert_equal(add_jitter(K, 1e-3), torch.ones(2, 3, 3) + torch.eye(3) * 1e-3)
@@ -7,10 +7,12 @@ import pytest
 import torch
 
 import pyro
-from pyro.contrib.gp.kernels import Matern32, RBF, WhiteNoise
+from pyro.contrib.gp.kernels import Matern32, RBF, Warping, WhiteNoise
 from pyro.contrib.gp.likelihoods import Gaussian
 from pyro.contrib.gp.models import (GPRegression, SparseGPRegression,
                                     VariationalGP, SparseVariationalGP)
+import pyro.contrib.gp.models.svgp as svgp_module
+from pyro.contrib.gp.util import conditional
 import pyro.distributions as dist
 from pyro.infer.mcmc.hmc import HMC
 from pyro.infer.mcmc.mcmc import MCMC
@@ -221,6 +223,264 @@ def test_inference_svgp():
     assert_equal((loc - target).abs().mean().item(), 0, prec=0.05)
 
 
+@pytest.mark.parametrize("model_class", [VariationalGP, SparseVariationalGP])
+def test_scale_tril_init(model_class):
+    if model_class is SparseVariationalGP:
+        gp = model_class(X, y2D, RBF(input_dim=3), X.clone(), Gaussian())
+        scale_tril = gp.u_scale_tril
+    else:
+        gp = model_class(X, y2D, RBF(input_dim=3), Gaussian())
+        scale_tril = gp.f_scale_tril
+    assert scale_tril.shape == (4, 2, 2)
+    assert scale_tril.is_contiguous()
+    assert_equal(scale_tril, torch.eye(2).expand(4, 2, 2))
+
+
+def test_svgp_mixed_precision_float32_unchanged():
+    Xnew = torch.tensor([[2., 3., 1.]])
+    svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(),
+                               mixed_precision=True)
+    loc, var = svgp(Xnew)
+    svgp.mixed_precision = False
+    loc1, var1 = svgp(Xnew)
+    assert_equal(loc, loc1)
+    assert_equal(var, var1)
+
+
+class _EyeKernel(torch.nn.Module):
+    def __init__(self, dtype):
+        super(_EyeKernel, self).__init__()
+        self.dtype = dtype
+
+    def forward(self, X, Z=None):
+        return torch.eye(X.shape[0], dtype=self.dtype)
+
+
+@pytest.mark.parametrize("dtype,expected", [
+    (torch.float16, torch.float16),
+    (torch.float32, torch.float32),
+    (torch.float64, torch.float32),
+])
+def test_svgp_mixed_precision_cholesky_dtype(monkeypatch, dtype, expected):
+    dtypes = []
+
+    def fake_cholesky(A, upper=False):
+        dtypes.append(A.dtype)
+        return A
+
+    monkeypatch.setattr(svgp_module, "matrix_cholesky_compat", fake_cholesky)
+    svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(),
+                               mixed_precision=True)
+    svgp.kernel = _EyeKernel(dtype)
+    with torch.no_grad():
+        Luu = svgp._get_Luu(svgp.Xu)
+    assert dtypes == [expected]
+    assert Luu.dtype == dtype
+
+
+def test_vgp_no_latent_sample_restores_state():
+    vgp = VariationalGP(X, y2D, RBF(input_dim=3), Gaussian())
+    with pytest.raises(RuntimeError):
+        with vgp._no_latent_sample():
+            assert not vgp._sample_latent
+            raise RuntimeError
+    assert vgp._sample_latent
+
+
+def test_svgp_lazy():
+    svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(), lazy=True)
+    assert svgp.u_loc is None
+    assert svgp.u_scale_tril is None
+    assert "u_loc" not in dict(svgp.named_parameters())
+
+    svgp.optimize(num_steps=1)
+    assert svgp.u_loc.shape == (4, 2)
+    assert svgp.u_scale_tril.shape == (4, 2, 2)
+    assert "u_loc" in dict(svgp.named_parameters())
+
+
+def test_svgp_lazy_fix_param():
+    svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(), lazy=True)
+    svgp.fix_param("u_loc")
+    assert "u_loc" in dict(svgp.named_parameters())
+    assert_equal(svgp.u_loc, torch.zeros(4, 2))
+
+    svgp.optimize(num_steps=1)
+    assert_equal(svgp.get_param("u_loc"), torch.zeros(4, 2))
+
+
+def test_svgp_lazy_load_state_dict():
+    svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian())
+    with torch.no_grad():
+        svgp.u_loc.normal_()
+        svgp.u_scale_tril.mul_(2.)
+    state_dict = svgp.state_dict()
+
+    lazy_svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(),
+                                    lazy=True)
+    lazy_svgp.load_state_dict(state_dict)
+    assert_equal(lazy_svgp.u_loc, svgp.u_loc)
+    assert_equal(lazy_svgp.u_scale_tril, svgp.u_scale_tril)
+    assert set(lazy_svgp.state_dict()) == set(state_dict)
+
+
+@pytest.mark.parametrize("compile", [False, True])
+def test_svgp_compile(monkeypatch, compile):
+    compiled = []
+    calls = []
+
+    def fake_compile(fn):
+        compiled.append(fn)
+
+        def wrapper(*args):
+            calls.append(args)
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(torch, "compile", fake_compile, raising=False)
+    monkeypatch.setattr(svgp_module, "_compiled_predictive", None)
+    svgp = SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(),
+                               compile=compile)
+    svgp.model()
+    svgp.model()
+
+    if compile:
+        assert compiled == [SparseVariationalGP._predictive]
+        assert len(calls) == 2
+    else:
+        assert compiled == []
+        assert calls == []
+
+
+def test_svgp_compile_unavailable(monkeypatch):
+    monkeypatch.delattr(torch, "compile", raising=False)
+    with pytest.raises(ValueError):
+        SparseVariationalGP(X, y2D, RBF(input_dim=3), X.clone(), Gaussian(), compile=True)
+
+
+def test_svgp_Luu_cache():
+    kernel = RBF(input_dim=3)
+    svgp = SparseVariationalGP(X, y2D, kernel, X.clone(), Gaussian())
+    Xnew = torch.tensor([[2., 3., 1.]])
+
+    with torch.no_grad():
+        loc0, var0 = svgp(Xnew)
+        Luu0 = svgp._Luu_cache
+        loc1, var1 = svgp(Xnew)
+        assert svgp._Luu_cache is Luu0
+    assert_equal(loc0, loc1)
+    assert_equal(var0, var1)
+
+    # changing a kernel's parameter invalidates the cache
+    lengthscale_name = pyro.param_with_module_name(kernel.name, "lengthscale")
+    with torch.no_grad():
+        pyro.param(lengthscale_name).unconstrained().add_(0.5)
+        svgp(Xnew)
+    assert svgp._Luu_cache is not None
+    assert svgp._Luu_cache is not Luu0
+    assert not torch.equal(svgp._Luu_cache, Luu0)
+
+    # cached factors are never used when gradients are required
+    loc, _ = svgp(Xnew)
+    assert loc.requires_grad
+
+
+def test_svgp_Luu_cache_fixed_params():
+    kernel = RBF(input_dim=3)
+    kernel.fix_param("variance")
+    kernel.fix_param("lengthscale")
+    svgp = SparseVariationalGP(X, y2D, kernel, X.clone(), Gaussian())
+    svgp.fix_param("Xu")
+
+    svgp.optimize(optim.Adam({"lr": 0.01}), num_steps=1)
+    Luu0 = svgp._Luu_cache
+    assert Luu0 is not None
+    svgp.optimize(optim.Adam({"lr": 0.01}), num_steps=2)
+    assert svgp._Luu_cache is Luu0
+
+
+def test_svgp_Luu_cache_dtype():
+    kernel = RBF(input_dim=3)
+    svgp = SparseVariationalGP(X, y2D, kernel, X.clone(), Gaussian())
+    Xnew = torch.tensor([[2., 3., 1.]])
+
+    with torch.no_grad():
+        svgp(Xnew)
+    assert svgp._Luu_cache.dtype == torch.float32
+
+    svgp.double()
+    pyro.clear_param_store()
+    with torch.no_grad():
+        loc, var = svgp(Xnew.double())
+    assert svgp._Luu_cache.dtype == torch.float64
+    assert loc.dtype == torch.float64
+    assert var.dtype == torch.float64
+
+
+def test_svgp_Luu_cache_warping():
+    linear = torch.nn.Linear(3, 2)
+    kernel = Warping(RBF(input_dim=2), iwarping_fn=linear)
+    svgp = SparseVariationalGP(X, y2D, kernel, X.clone(), Gaussian())
+    Xnew = torch.tensor([[2., 3., 1.]])
+
+    with torch.no_grad():
+        svgp(Xnew)
+        Luu0 = svgp._Luu_cache
+        linear.weight.add_(1.)
+        svgp(Xnew)
+    assert svgp._Luu_cache is not Luu0
+    assert not torch.equal(svgp._Luu_cache, Luu0)
+
+
+@pytest.mark.parametrize("full_cov", [False, True])
+def test_svgp_predict_cache(full_cov):
+    kernel = RBF(input_dim=3)
+    svgp = SparseVariationalGP(X, y2D, kernel, X.clone(), Gaussian())
+    svgp.optimize(optim.Adam({"lr": 0.1}), num_steps=2)
+    Xnew = torch.tensor([[2., 3., 1.], [1., 1., 1.], [4., 2., 0.]])
+
+    with torch.no_grad():
+        loc0, cov0 = svgp(Xnew, full_cov=full_cov)
+        whitened_u = svgp._pred_cache[2]
+        loc1, cov1 = svgp(Xnew[:2], full_cov=full_cov)
+        assert svgp._pred_cache[2] is whitened_u
+        loc, cov = conditional(Xnew, svgp.get_param("Xu"), kernel, svgp.get_param("u_loc"),
+                               svgp.get_param("u_scale_tril"), full_cov=full_cov,
+                               jitter=svgp.jitter)
+
+    assert_equal(loc0, loc)
+    assert_equal(cov0, cov)
+    assert_equal(loc1, loc[..., :2])
+
+    # the cache refers to param store tensors instead of copying them
+    u_loc_name = pyro.param_with_module_name(svgp.name, "u_loc")
+    u_loc_store = pyro.param(u_loc_name).unconstrained()
+    assert svgp._pred_cache[1][0][0] is u_loc_store
+
+    # an in-place update of the param store invalidates the cache
+    with torch.no_grad():
+        u_loc_store.add_(1.)
+        loc2, _ = svgp(Xnew, full_cov=full_cov)
+    assert svgp._pred_cache[2] is not whitened_u
+    assert not torch.equal(loc2, loc0)
+
+
+def test_svgp_mixed_precision():
+    X64, y64 = X.double(), y2D.double()
+    svgp = SparseVariationalGP(X64, y64, RBF(input_dim=3).double(), X64.clone(), Gaussian().double(),
+                               mixed_precision=True)
+    Xnew = torch.tensor([[2., 3., 1.]], dtype=torch.float64)
+    loc, var = svgp(Xnew)
+    assert loc.dtype == torch.float64
+    assert var.dtype == torch.float64
+
+    svgp.mixed_precision = False
+    svgp.jitter = 1e-5
+    loc1, var1 = svgp(Xnew)
+    assert_equal(loc, loc1, prec=1e-4)
+    assert_equal(var, var1, prec=1e-4)
+
+
 @pytest.mark.parametrize("model_class, X, y, kernel, likelihood", TEST_CASES, ids=TEST_IDS)
 def test_inference_with_empty_latent_shape(model_class, X, y, kernel, likelihood):
     # regression models don't use latent_shape (default=torch.Size([]))
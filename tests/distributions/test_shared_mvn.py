@@ -0,0 +1,27 @@
+from __future__ import absolute_import, division, print_function
+
+import pytest
+import torch
+
+from pyro.distributions import MultivariateNormal, SharedScaleTrilMultivariateNormal
+
+from tests.common import assert_equal
+
+
+@pytest.mark.parametrize("batch_shape", [(), (4,), (2, 3)])
+def test_log_prob(batch_shape):
+    loc = torch.randn(batch_shape + (3,))
+    scale_tril = torch.rand(3, 3).tril(-1) + torch.rand(3).exp().diag()
+    value = torch.randn((5,) + batch_shape + (3,))
+
+    mvn = MultivariateNormal(loc, scale_tril=scale_tril)
+    shared_mvn = SharedScaleTrilMultivariateNormal(loc, scale_tril)
+
+    actual = shared_mvn.log_prob(value)
+    assert actual.shape == (5,) + batch_shape
+    assert_equal(actual, mvn.log_prob(value), prec=1e-4)
+
+
+def test_scale_tril_dim():
+    with pytest.raises(ValueError):
+        SharedScaleTrilMultivariateNormal(torch.zeros(2, 3), torch.eye(3).expand(2, 3, 3))
@@ -4,7 +4,9 @@ import numpy as np
 import pytest
 import torch
 
-from pyro.distributions.util import broadcast_shape, sum_leftmost, sum_rightmost
+from pyro.distributions.util import (broadcast_shape, matrix_cholesky_compat, matrix_triangular_solve_compat,
+                                     sum_leftmost, sum_rightmost)
+from tests.common import assert_equal
 
 
 @pytest.mark.parametrize('shapes', [
@@ -93,3 +95,33 @@ def test_sum_leftmost():
     assert sum_leftmost(x, -1).shape == (4,)
     assert sum_leftmost(x, -2).shape == (3, 4)
     assert sum_leftmost(x, float('inf')).shape == ()
+
+
+@pytest.mark.parametrize('batch_shape', [(), (3,), (2, 3)])
+@pytest.mark.parametrize('upper', [False, True])
+def test_matrix_cholesky_compat(batch_shape, upper):
+    A = torch.randn(batch_shape + (4, 4))
+    A = A.matmul(A.transpose(-2, -1)) + torch.eye(4)
+    L = matrix_cholesky_compat(A, upper=upper)
+    assert L.shape == A.shape
+    for Ai, Li in zip(A.reshape(-1, 4, 4), L.reshape(-1, 4, 4)):
+        if upper:
+            assert_equal(Li, Li.triu())
+            assert_equal(Li.t().matmul(Li), Ai, prec=1e-4)
+        else:
+            assert_equal(Li, Li.tril())
+            assert_equal(Li.matmul(Li.t()), Ai, prec=1e-4)
+
+
+@pytest.mark.parametrize('b_shape', [(4,), (4, 3)])
+@pytest.mark.parametrize('upper', [False, True])
+@pytest.mark.parametrize('requires_grad', [False, True])
+def test_matrix_triangular_solve_compat(b_shape, upper, requires_grad):
+    A = torch.rand(4, 4).tril(-1) + torch.rand(4).exp().diag()
+    if upper:
+        A = A.t().contiguous()
+    A.requires_grad_(requires_grad)
+    b = torch.randn(b_shape)
+    x = matrix_triangular_solve_compat(b, A, upper=upper)
+    assert x.shape == b.shape
+    assert_equal(A.matmul(x), b, prec=1e-4)